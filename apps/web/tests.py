@@ -1,3 +1,163 @@
-from django.test import TestCase
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from django.test import SimpleTestCase, override_settings
+
+from . import views
+
+llm_service = views.llm_service
+
+
+class ApiTestCase(SimpleTestCase):
+    """Points the views at a temporary config file with empty caches"""
+
+    def setUp(self):
+        llm_service._flush_config_writes()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_path = Path(self.tmp_dir.name) / 'llm_config.json'
+
+        patcher = mock.patch.object(llm_service, 'CONFIG_PATH', self.config_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._reset_state()
+
+    def tearDown(self):
+        llm_service._flush_config_writes()
+        self._reset_state()
+
+    def _reset_state(self):
+        llm_service._config_cache = None
+        llm_service._config_mtime = -1
+        llm_service._models_json = None
+        llm_service._model_indices = {}
+        llm_service._config_version = 0
+        llm_service._config_dirty = False
+        llm_service._config_write_error = None
+        views._refresh_cache = None
+
+    def _write_file(self, config):
+        self.config_path.write_bytes(orjson.dumps(config))
+
+    def _read_file(self):
+        return orjson.loads(self.config_path.read_bytes())
+
+    def _post(self, url, data):
+        return self.client.post(url, orjson.dumps(data), content_type='application/json')
+
+
+class ConfigApiTests(ApiTestCase):
+    def test_unprojectable_language_models_do_not_hide_config(self):
+        config = llm_service.get_default_config()
+        config['language_models'] = None
+        config['voice_models'] = [{'file_name': 'voice.bin'}]
+        config['model_directories'] = {'language': '/models/lang', 'voice': '/models/voice'}
+        self._write_file(config)
+
+        self.assertEqual(self.client.get('/api/config').json(), config)
+
+        response = self._post('/api/config', {'port': 9000})
+        self.assertEqual(response.status_code, 200)
+        llm_service.wait_for_config_writes()
+
+        saved = self._read_file()
+        self.assertEqual(saved['frontend_defaults'], {'port': 9000})
+        self.assertEqual(saved['voice_models'], config['voice_models'])
+        self.assertEqual(saved['model_directories'], config['model_directories'])
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=64)
+    def test_oversized_body_is_rejected_with_413(self):
+        response = self._post('/api/config', {'model': 'x' * 128})
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(self.config_path.exists())
+
+
+class RefreshModelsApiTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model_dir = Path(self.tmp_dir.name) / 'models'
+        self.model_dir.mkdir()
+        # Listings are otherwise reused for DIR_LISTING_TTL seconds
+        patcher = mock.patch.object(llm_service, 'DIR_LISTING_TTL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _configure(self, *file_names):
+        config = llm_service.get_default_config()
+        config['model_directories']['language'] = str(self.model_dir)
+        config['language_models'] = [{'file_name': name} for name in file_names]
+        self._write_file(config)
+
+    def _exists(self):
+        response = self.client.get('/api/models/refresh')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['language']['exists']
+
+    def test_symlinks_are_checked_against_their_targets(self):
+        target = self.model_dir / 'target.gguf'
+        target.touch()
+        (self.model_dir / 'linked.gguf').symlink_to(target)
+        (self.model_dir / 'broken.gguf').symlink_to(self.model_dir / 'gone.gguf')
+        self._configure('target.gguf', 'linked.gguf', 'broken.gguf', 'absent.gguf')
+
+        self.assertEqual(self._exists(), [True, True, False, False])
+
+        # Repairing a link need not change the directory's mtime
+        stat = os.stat(self.model_dir)
+        (self.model_dir / 'gone.gguf').touch()
+        os.utime(self.model_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self._exists(), [True, True, True, False])
+
+    def test_cached_response_follows_directory_and_config_changes(self):
+        self._configure('a.gguf')
+        self.assertEqual(self._exists(), [False])
+        self.assertIsNotNone(views._refresh_cache)
+
+        # Unchanged inputs are answered from the cache
+        with mock.patch.object(llm_service, 'load_config') as load_config:
+            self.assertEqual(self._exists(), [False])
+        load_config.assert_not_called()
+
+        # A new file changes the directory listing
+        (self.model_dir / 'a.gguf').touch()
+        self.assertEqual(self._exists(), [True])
+
+        # A saved config change bumps the config version
+        response = self._post('/api/models/manage', {
+            'action': 'add', 'type': 'language', 'data': {'file_name': 'b.gguf'}
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._exists(), [True, False])
+
+
+class SchemaValidationTests(ApiTestCase):
+    def test_manage_models_rejects_invalid_bodies(self):
+        self._write_file(llm_service.get_default_config())
+        invalid_bodies = [
+            {'action': 'rename', 'type': 'language', 'data': {'file_name': 'a.gguf'}},
+            {'action': 'add', 'type': 'vision', 'data': {'file_name': 'a.gguf'}},
+            {'action': 'add', 'type': 'language', 'data': {}},
+            {'action': 'add', 'type': 'language', 'data': {'file_name': 7}},
+            {'action': 'add', 'type': 'language'},
+            ['not', 'an', 'object'],
+        ]
+        for body in invalid_bodies:
+            with self.subTest(body=body):
+                response = self._post('/api/models/manage', body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+        self.assertEqual(self._read_file(), llm_service.get_default_config())
+
+    def test_update_directories_rejects_invalid_bodies(self):
+        self._write_file(llm_service.get_default_config())
+        for body in ({'language': '/models'}, {'language': '/models', 'voice': None}, 'models'):
+            with self.subTest(body=body):
+                response = self._post('/api/config/directories', body)
+                self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self._read_file(), llm_service.get_default_config())
@@ -5,6 +5,9 @@ urlpatterns = [
     # Main page
     path('', views.index, name='index'),
     
+    # Bootstrap API
+    path('api/bootstrap', views.api_bootstrap, name='api_bootstrap'),
+    
     # Configuration API
     path('api/config', views.api_config, name='api_config'),
     path('api/config/directories', views.api_update_directories, name='api_update_directories'),
@@ -1,9 +1,13 @@
 import json
 import os
 import sys
+from functools import wraps
 from pathlib import Path
+import fastjsonschema
+import orjson
+from django.core.exceptions import RequestDataTooBig
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
@@ -12,6 +16,62 @@ LIBS_PATH = Path(__file__).resolve().parent.parent.parent / 'libs'
 sys.path.insert(0, str(LIBS_PATH))
 import llm_service
 
+# Request body validators, compiled once at import
+_validate_directories = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['language', 'voice'],
+    'properties': {
+        'language': {'type': 'string'},
+        'voice': {'type': 'string'}
+    }
+})
+
+_validate_manage_models = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['action', 'type', 'data'],
+    'properties': {
+        'action': {'enum': ['add', 'remove']},
+        'type': {'enum': ['language', 'voice']},
+        'data': {
+            'type': 'object',
+            'required': ['file_name'],
+            'properties': {
+                'file_name': {'type': 'string'}
+            }
+        }
+    }
+})
+
+# Last /api/models/refresh response with the inputs it was computed from
+_refresh_cache = None
+
+# Pre-serialized bodies for the frequently polled status endpoint
+_STATUS_JSON = {
+    status: orjson.dumps({'status': status.label})
+    for status in llm_service.ServerStatus
+}
+
+
+def fast_json(obj, status=200):
+    """Serialize *obj* with orjson straight to a JSON HttpResponse"""
+    return HttpResponse(orjson.dumps(obj), status=status, content_type='application/json')
+
+
+def reject_large_bodies(view):
+    """Answer bodies over settings.DATA_UPLOAD_MAX_MEMORY_SIZE with 413
+
+    The body is read before the view runs, so the view's own error
+    handling never sees RequestDataTooBig.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            request.body
+        except RequestDataTooBig:
+            return fast_json({'error': 'payload too large'}, 413)
+        return view(request, *args, **kwargs)
+    return wrapper
+
 
 def index(request):
     """Serve the main page"""
@@ -23,34 +83,61 @@ def index(request):
 # ============================================================================
 
 @csrf_exempt
+@reject_large_bodies
 def api_config(request):
     """GET/POST /api/config - Load or save configuration"""
     if request.method == 'GET':
         config = llm_service.load_config()
         if config:
-            return JsonResponse(config)
+            return fast_json(config)
         else:
-            return JsonResponse({'error': 'Failed to load configuration'}, status=500)
+            return fast_json({'error': 'Failed to load configuration'}, 500)
     
     elif request.method == 'POST':
         try:
-            config = llm_service.load_config()
-            if not config:
-                return JsonResponse({'error': 'Failed to load configuration'}, status=500)
-            
             new_defaults = json.loads(request.body)
-            config['frontend_defaults'] = new_defaults
             
-            if llm_service.save_config(config):
-                return JsonResponse({'success': True, 'message': 'Configuration saved successfully'})
+            with llm_service.edit_config() as config:
+                if not config:
+                    return fast_json({'error': 'Failed to load configuration'}, 500)
+                
+                config['frontend_defaults'] = new_defaults
+                saved = llm_service.save_config(config)
+            
+            if saved:
+                return fast_json({'success': True, 'message': 'Configuration saved successfully'})
             else:
-                return JsonResponse({'error': 'Failed to save configuration'}, status=500)
+                return fast_json({'error': 'Failed to save configuration'}, 500)
                 
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            return fast_json({'error': str(e)}, 500)
     
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
+    return fast_json({'error': 'Method not allowed'}, 405)
+
+
+
+# ============================================================================
+# Bootstrap API
+# ============================================================================
+
+@require_http_methods(["GET"])
+def api_bootstrap(request):
+    """GET /api/bootstrap - Config, models and server status in one response
 
+    Lets the page load with a single request and a single config read
+    instead of separate calls to /api/config, /api/models and
+    /api/server/status.
+    """
+    config = llm_service.load_config()
+    if not config:
+        return fast_json({'error': 'Failed to load configuration'}, 500)
+    
+    return fast_json({
+        'config': config,
+        'models': llm_service.project_models(config) or [],
+        'status': llm_service.get_server_status().label,
+        'config_error': llm_service.get_config_write_error()
+    })
 
 
 # ============================================================================
@@ -59,126 +146,164 @@ def api_config(request):
 
 def api_get_models(request):
     """GET /api/models - Return list of available language models"""
-    config = llm_service.load_config()
-    if config and 'language_models' in config:
-        models = []
-        for model in config['language_models']:
-            models.append({
-                'file_name': model.get('file_name', ''),
-                'nickname': model.get('nickname', model.get('file_name', '')),
-                'parameters_billions': model.get('parameters_billions', 0)
-            })
-        return JsonResponse(models, safe=False)
+    body = llm_service.get_models_json()
+    if body is not None:
+        return HttpResponse(body, content_type='application/json')
     else:
-        return JsonResponse({'error': 'Failed to load models'}, status=500)
+        return fast_json({'error': 'Failed to load models'}, 500)
+
+
+def _cached_refresh_body(config_version):
+    """Return the cached refresh response if none of its inputs changed
+
+    list_model_files() hands back the same set object for as long as a
+    directory is unchanged, so an identity check covers both directories.
+    """
+    cached = _refresh_cache
+    if cached is None or config_version is None or cached['config_version'] != config_version:
+        return None
+    if llm_service.list_model_files(cached['lang_dir']) is not cached['lang_files']:
+        return None
+    if llm_service.list_model_files(cached['voice_dir']) is not cached['voice_files']:
+        return None
+    return cached['body']
 
 
 def api_refresh_models(request):
     """GET /api/models/refresh - Check if model files exist in configured directories"""
+    global _refresh_cache
     try:
+        config_version = llm_service.get_config_version()
+        body = _cached_refresh_body(config_version)
+        if body is not None:
+            return HttpResponse(body, content_type='application/json')
+        
         config = llm_service.load_config()
         if not config:
-            return JsonResponse({'error': 'Failed to load configuration'}, status=500)
+            return fast_json({'error': 'Failed to load configuration'}, 500)
             
         model_dirs = config.get('model_directories', {})
         lang_dir = model_dirs.get('language', '')
         voice_dir = model_dirs.get('voice', '')
         
-        results = {
-            'language': [],
-            'voice': []
-        }
+        # Parallel lists per type: 'exists'[i] is the status of 'models'[i]
+        results = {}
+        listings = {}
+        cacheable = True
         
-        # Check language models
-        for model in config.get('language_models', []):
-            path = os.path.join(lang_dir, model['file_name']) if lang_dir else ''
-            exists = os.path.exists(path) if path else False
-            results['language'].append({
-                **model,
-                'exists': exists,
-                'path': path
-            })
+        # Check language and voice models against one listing per directory
+        for kind, base_dir in (('language', lang_dir), ('voice', voice_dir)):
+            present = listings[kind] = llm_service.list_model_files(base_dir)
+            models = config.get(f'{kind}_models', [])
+            names = [model['file_name'] for model in models]
+            exists = [name in present for name in names]
             
-        # Check voice models
-        for model in config.get('voice_models', []):
-            path = os.path.join(voice_dir, model['file_name']) if voice_dir else ''
-            exists = os.path.exists(path) if path else False
-            results['voice'].append({
-                **model,
-                'exists': exists,
-                'path': path
-            })
+            for i, name in enumerate(names):
+                if exists[i] or not base_dir:
+                    continue
+                # Misses may be nested paths, symlinks or a different case on
+                # a case-insensitive filesystem, so ask the filesystem
+                path = os.path.join(base_dir, name)
+                exists[i] = os.path.exists(path)
+                if exists[i] or os.path.lexists(path) or os.sep in name or '/' in name:
+                    # Not covered by the directory's mtime
+                    cacheable = False
             
-        return JsonResponse(results)
+            results[kind] = {
+                'dir': base_dir,
+                'models': models,
+                'exists': exists
+            }
+        
+        body = orjson.dumps(results)
+        if cacheable:
+            _refresh_cache = {
+                'config_version': config_version,
+                'lang_dir': lang_dir,
+                'voice_dir': voice_dir,
+                'lang_files': listings['language'],
+                'voice_files': listings['voice'],
+                'body': body
+            }
+        return HttpResponse(body, content_type='application/json')
         
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return fast_json({'error': str(e)}, 500)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@reject_large_bodies
 def api_manage_models(request):
     """POST /api/models/manage - Add or remove models"""
     try:
-        config = llm_service.load_config()
-        if not config:
-            return JsonResponse({'error': 'Failed to load configuration'}, status=500)
-            
         data = json.loads(request.body)
-        action = data.get('action')
-        model_type = data.get('type')  # 'language' or 'voice'
-        model_data = data.get('data')
+        try:
+            _validate_manage_models(data)
+        except fastjsonschema.JsonSchemaException as e:
+            return fast_json({'error': str(e)}, 400)
         
-        if model_type not in ['language', 'voice']:
-            return JsonResponse({'error': 'Invalid model type'}, status=400)
-            
+        action = data['action']  # 'add' or 'remove'
+        model_type = data['type']  # 'language' or 'voice'
+        model_data = data['data']
         key = f"{model_type}_models"
         
-        # Ensure key exists
-        if key not in config:
-            config[key] = []
-        
-        if action == 'add':
-            # Check if model already exists
-            for m in config[key]:
-                if m['file_name'] == model_data['file_name']:
-                    return JsonResponse({'error': 'Model already exists'}, status=400)
-            config[key].append(model_data)
+        with llm_service.edit_models(key) as (config, index):
+            if not config:
+                return fast_json({'error': 'Failed to load configuration'}, 500)
             
-        elif action == 'remove':
-            file_name = model_data.get('file_name')
-            config[key] = [m for m in config[key] if m['file_name'] != file_name]
+            # Ensure key exists
+            if key not in config:
+                config[key] = []
             
-        else:
-            return JsonResponse({'error': 'Invalid action'}, status=400)
+            if action == 'add':
+                if model_data['file_name'] in index:
+                    return fast_json({'error': 'Model already exists'}, 400)
+                config[key].append(model_data)
+                saved = llm_service.save_config(config)
+                
+            else:
+                # Drop every entry with this file_name, last first so
+                # the remaining positions stay valid
+                positions = index.get(model_data['file_name'], ())
+                for position in reversed(positions):
+                    del config[key][position]
+                saved = llm_service.save_config(config) if positions else True
             
-        if llm_service.save_config(config):
-            return JsonResponse({'success': True, 'message': 'Models updated successfully', 'models': config[key]})
+        if saved:
+            return fast_json({'success': True, 'message': 'Models updated successfully', 'models': config[key]})
         else:
-            return JsonResponse({'error': 'Failed to save configuration'}, status=500)
+            return fast_json({'error': 'Failed to save configuration'}, 500)
             
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return fast_json({'error': str(e)}, 500)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@reject_large_bodies
 def api_update_directories(request):
     """POST /api/config/directories - Update model directories"""
     try:
-        config = llm_service.load_config()
-        if not config:
-            return JsonResponse({'error': 'Failed to load configuration'}, status=500)
-        
         directories = json.loads(request.body)
-        if 'language' in directories and 'voice' in directories:
+        try:
+            _validate_directories(directories)
+        except fastjsonschema.JsonSchemaException as e:
+            return fast_json({'error': str(e)}, 400)
+        
+        with llm_service.edit_config() as config:
+            if not config:
+                return fast_json({'error': 'Failed to load configuration'}, 500)
+            
             config['model_directories'] = directories
-            if llm_service.save_config(config):
-                return JsonResponse({'success': True, 'message': 'Directories updated successfully'})
+            saved = llm_service.save_config(config)
         
-        return JsonResponse({'error': 'Invalid directory data'}, status=400)
+        if saved:
+            return fast_json({'success': True, 'message': 'Directories updated successfully'})
+        else:
+            return fast_json({'error': 'Failed to save configuration'}, 500)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return fast_json({'error': str(e)}, 500)
 
 
 # ============================================================================
@@ -186,13 +311,21 @@ def api_update_directories(request):
 # ============================================================================
 
 def api_server_status(request):
-    """GET /api/server/status - Get current server status"""
+    """GET /api/server/status - Get current server status
+
+    Also carries the last failed background config write, if any, so
+    the page can report it.
+    """
     status = llm_service.get_server_status()
-    return JsonResponse({'status': status})
+    config_error = llm_service.get_config_write_error()
+    if config_error is not None:
+        return fast_json({'status': status.label, 'config_error': config_error})
+    return HttpResponse(_STATUS_JSON[status], content_type='application/json')
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@reject_large_bodies
 def api_server_start(request):
     """POST /api/server/start - Start the LLM server"""
     try:
@@ -203,17 +336,17 @@ def api_server_start(request):
             if full_config and 'frontend_defaults' in full_config:
                 config_data = full_config['frontend_defaults']
             else:
-                return JsonResponse({'error': 'No configuration provided'}, status=400)
+                return fast_json({'error': 'No configuration provided'}, 400)
         
         success, message = llm_service.start_server(config_data)
         
         if success:
-            return JsonResponse({'success': True, 'message': message})
+            return fast_json({'success': True, 'message': message})
         else:
-            return JsonResponse({'error': message}, status=400)
+            return fast_json({'error': message}, 400)
             
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return fast_json({'error': str(e)}, 500)
 
 
 @csrf_exempt
@@ -224,9 +357,9 @@ def api_server_stop(request):
         success, message = llm_service.stop_server()
         
         if success:
-            return JsonResponse({'success': True, 'message': message})
+            return fast_json({'success': True, 'message': message})
         else:
-            return JsonResponse({'error': message}, status=400)
+            return fast_json({'error': message}, 400)
             
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return fast_json({'error': str(e)}, 500)
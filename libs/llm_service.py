@@ -3,20 +3,72 @@ LLM Service Layer for Django
 
 This module provides:
 - Configuration loading/saving (llm_config.json)
+- Cached model directory listings
 - LLM server state management
 - Server start/stop functionality
 """
 
+import atexit
+import copy
+import contextlib
+import queue
 import threading
+import time
 import types
-import json
 import os
+from dataclasses import dataclass, fields
+from enum import IntEnum
 from pathlib import Path
 
+import orjson
+
+
+class ServerStatus(IntEnum):
+    """Lifecycle states of the LLM server"""
+    STOPPED = 0
+    STARTING = 1
+    RUNNING = 2
+    ERROR = 3
+    STOPPING = 4
+
+    @property
+    def label(self):
+        """Lowercase name reported by the web API"""
+        return self.name.lower()
+
+
 # Global server state
 _llm_server = None
 _server_thread = None
-_server_status = "stopped"  # stopped, starting, running, error
+_server_status = ServerStatus.STOPPED
+_shutdown_event = threading.Event()
+# Guards the check-then-set transitions of the server globals above
+_state_lock = threading.Lock()
+
+# Parsed configuration cache, invalidated when the file's mtime changes
+_config_cache = None
+_config_mtime = -1
+_models_json = None  # Serialized project_models() of the cached config
+_model_indices = {}  # Models list key -> {file_name: positions}, built lazily
+_config_lock = threading.Lock()
+# Serializes read-modify-write cycles, see edit_config()
+_config_write_lock = threading.Lock()
+
+# Background config writer. While a save is pending (_config_dirty) the
+# in-memory cache is authoritative and the file's mtime is not consulted.
+_config_version = 0
+_config_dirty = False
+_config_write_error = None  # Last background write failure, see get_config_write_error()
+_write_queue = queue.Queue()
+_writer_thread = None
+
+# Model directory listings: path -> (mtime_ns, checked_at, file names)
+_dir_listing_cache = {}
+_dir_listing_lock = threading.Lock()
+_NO_FILES = frozenset()
+
+# Seconds a directory listing is trusted before its mtime is re-checked
+DIR_LISTING_TTL = 2.0
 
 # Configuration path - use environment variable or default
 CONFIG_PATH = Path(os.environ.get('LLM_CONFIG_PATH', Path.home() / '.llm_config.json'))
@@ -27,31 +79,270 @@ def get_config_path():
     return CONFIG_PATH
 
 
+def _current_config():
+    """Return the cached config, re-reading the file if its mtime changed
+
+    Must be called with _config_lock held. The returned dict is shared and
+    must not be mutated. Raises FileNotFoundError if the file is missing.
+    """
+    if _config_dirty:
+        return _config_cache
+    mtime = os.stat(CONFIG_PATH).st_mtime_ns
+    if _config_cache is None or mtime != _config_mtime:
+        _set_config_cache(orjson.loads(CONFIG_PATH.read_bytes()), mtime)
+    return _config_cache
+
+
+def _set_config_cache(config, mtime):
+    """Store a parsed config and everything derived from it
+
+    Must be called with _config_lock held. A language_models list that
+    can't be projected only leaves the models JSON empty, so the rest of
+    the config stays readable and editable.
+    """
+    global _config_cache, _config_mtime, _models_json, _model_indices
+    try:
+        models = project_models(config)
+        models_json = orjson.dumps(models) if models is not None else None
+    except Exception as e:
+        print(f"Error projecting language models: {e}")
+        models_json = None
+    
+    _config_cache = config
+    _config_mtime = mtime
+    _models_json = models_json
+    _model_indices = {}
+
+
 def load_config():
-    """Load configuration from llm_config.json"""
+    """Load configuration from llm_config.json
+
+    The parsed file is cached and only re-read when its mtime changes.
+    Callers receive a copy, so they are free to mutate the result.
+    """
     try:
-        if CONFIG_PATH.exists():
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            # Return default config if file doesn't exist
-            return get_default_config()
+        with _config_lock:
+            return copy.deepcopy(_current_config())
+    except FileNotFoundError:
+        # Return default config if file doesn't exist
+        return get_default_config()
     except Exception as e:
         print(f"Error loading config: {e}")
         return get_default_config()
 
 
+def project_models(config):
+    """Reduce configured language models to the fields the model picker needs
+
+    Returns None if the config has no language_models list.
+    """
+    if not isinstance(config.get('language_models'), list):
+        return None
+    return [
+        {
+            'file_name': model.get('file_name', ''),
+            'nickname': model.get('nickname', model.get('file_name', '')),
+            'parameters_billions': model.get('parameters_billions', 0)
+        }
+        for model in config['language_models']
+    ]
+
+
+def get_config_version():
+    """Return a token that changes whenever the configuration changes
+
+    Returns None if the configuration can't be read.
+    """
+    try:
+        with _config_lock:
+            _current_config()
+            return (_config_mtime, _config_version)
+    except Exception:
+        return None
+
+
+def get_models_json():
+    """Return project_models() of the current config serialized as JSON
+
+    The bytes are built once per config version, so serving them costs no
+    more than the mtime check. Returns None if there are no language_models.
+    """
+    try:
+        with _config_lock:
+            _current_config()
+            return _models_json
+    except FileNotFoundError:
+        # Same answer load_config() gives for a missing file
+        return orjson.dumps(project_models(get_default_config()))
+    except Exception as e:
+        print(f"Error loading config: {e}")
+        return orjson.dumps(project_models(get_default_config()))
+
+
+def _build_model_index(models):
+    """Map each file_name in *models* to the tuple of its list positions"""
+    index = {}
+    for position, model in enumerate(models):
+        index.setdefault(model.get('file_name'), []).append(position)
+    return types.MappingProxyType({name: tuple(positions) for name, positions in index.items()})
+
+
+def _load_config_with_index(key):
+    """Return a copy of the config and the file_name index of config[key]
+
+    Both come from the same cache read. The index is built once per config
+    version; fallbacks to the default config get a fresh one.
+    """
+    try:
+        with _config_lock:
+            config = _current_config()
+            index = _model_indices.get(key)
+            if index is None:
+                index = _model_indices[key] = _build_model_index(config.get(key, []))
+            return copy.deepcopy(config), index
+    except FileNotFoundError:
+        # Return default config if file doesn't exist
+        config = get_default_config()
+    except Exception as e:
+        print(f"Error loading config: {e}")
+        config = get_default_config()
+    return config, _build_model_index(config.get(key, []))
+
+
+@contextlib.contextmanager
+def edit_models(key):
+    """Like edit_config(), but yield (config, index) for the models list *key*
+
+    The index maps file_name to its positions in config[key] and is
+    read-only. It describes the yielded copy until that copy is mutated.
+    """
+    with _config_write_lock:
+        yield _load_config_with_index(key)
+
+
+@contextlib.contextmanager
+def edit_config():
+    """Yield a mutable copy of the configuration for a read-modify-write
+
+    Concurrent edits are serialized, so one request can't overwrite the
+    changes of another made between its load and its save. Call
+    save_config() inside the block to persist the changes.
+    """
+    with _config_write_lock:
+        yield load_config()
+
+
 def save_config(config_data):
-    """Save configuration to llm_config.json"""
+    """Save configuration to llm_config.json
+
+    The in-memory cache is updated immediately, so later loads see the new
+    values, and the file itself is written by a background thread. Returns
+    False if the configuration can't be serialized. Failures of the
+    background write are reported by get_config_write_error().
+    """
+    global _config_version, _config_dirty
     try:
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4)
+        data = orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+        with _config_lock:
+            _set_config_cache(copy.deepcopy(config_data), _config_mtime)
+            _config_version += 1
+            _config_dirty = True
+            version = _config_version
+        _start_config_writer()
+        _write_queue.put((version, data))
         return True
     except Exception as e:
         print(f"Error saving config: {e}")
         return False
 
 
+def _start_config_writer():
+    """Start the background config writer thread if it isn't running"""
+    global _writer_thread
+    with _config_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_config_writer, daemon=True)
+            _writer_thread.start()
+
+
+def _config_writer():
+    """Persist queued config snapshots until a None sentinel arrives
+
+    Bursts of saves are coalesced: only the snapshot with the highest
+    version is written, whatever order concurrent savers queued them in.
+    """
+    while True:
+        items = [_write_queue.get()]
+        while True:
+            try:
+                items.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            snapshots = [item for item in items if item is not None]
+            if snapshots:
+                _write_config_file(*max(snapshots, key=lambda item: item[0]))
+        finally:
+            for _ in items:
+                _write_queue.task_done()
+        if len(snapshots) != len(items):
+            return
+
+
+def _write_config_file(version, data):
+    """Write serialized config *data* to disk
+
+    The file is written to a temporary sibling first and then renamed
+    over the original, so readers never see a partially written file.
+    On failure the error is kept for get_config_write_error() until a
+    later write succeeds, and the file becomes authoritative again,
+    discarding unsaved changes.
+    """
+    global _config_mtime, _config_dirty, _config_write_error
+    try:
+        tmp_path = CONFIG_PATH.with_suffix('.json.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, CONFIG_PATH)
+        with _config_lock:
+            _config_write_error = None
+            # Hand authority back to the file unless a newer save is pending
+            if version == _config_version:
+                _config_mtime = os.stat(CONFIG_PATH).st_mtime_ns
+                _config_dirty = False
+    except Exception as e:
+        print(f"Error saving config: {e}")
+        with _config_lock:
+            _config_write_error = str(e)
+            if version == _config_version:
+                # Force the next read to re-parse the file
+                _config_mtime = -1
+                _config_dirty = False
+
+
+def get_config_write_error():
+    """Return the message of the last failed config write, or None
+
+    Cleared once a later write succeeds.
+    """
+    return _config_write_error
+
+
+def wait_for_config_writes():
+    """Block until every queued config save has been processed"""
+    _write_queue.join()
+
+
+@atexit.register
+def _flush_config_writes():
+    """Let the writer finish any pending save and stop it"""
+    global _writer_thread
+    if _writer_thread is not None:
+        _write_queue.put(None)
+        _writer_thread.join()
+        _writer_thread = None
+
+
 def get_default_config():
     """Return default configuration"""
     return {
@@ -78,128 +369,243 @@ def get_default_config():
     }
 
 
+def list_model_files(directory):
+    """Return the set of non-symlink entry names in a model directory
+
+    One scandir() per directory replaces a stat() per model. Listings are
+    reused for DIR_LISTING_TTL seconds, and after that for as long as the
+    directory's mtime is unchanged. Missing directories yield an empty set.
+    An unchanged listing is returned as the same set object.
+
+    Symlinks are left out because their targets can vanish without the
+    directory changing; callers should check names that miss with
+    os.path.exists().
+    """
+    if not directory:
+        return _NO_FILES
+
+    now = time.monotonic()
+    with _dir_listing_lock:
+        cached = _dir_listing_cache.get(directory)
+    if cached and now - cached[1] < DIR_LISTING_TTL:
+        return cached[2]
+
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return _NO_FILES
+
+    if cached and cached[0] == mtime:
+        names = cached[2]
+    else:
+        try:
+            with os.scandir(directory) as entries:
+                names = frozenset(entry.name for entry in entries if not entry.is_symlink())
+        except OSError:
+            return _NO_FILES
+
+    with _dir_listing_lock:
+        _dir_listing_cache[directory] = (mtime, now, names)
+    return names
+
+
+@dataclass(frozen=True, slots=True)
+class StartConfig:
+    """Server settings sent by the web UI, numeric fields coerced to their types"""
+    model: str = ''
+    host: str = '127.0.0.1'
+    port: int = 8080
+    max_tokens: int = 13  # slider exponent
+    context_size: int = 15  # slider exponent
+    temperature: float = 0.1
+    repeat_penalty: float = 1.2
+    threads: int = 0
+    gpu_layers: int = 999
+    compute_mode: str = 'auto'
+
+    def __post_init__(self):
+        # String fields pass through as sent, so a null model stays None
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if field.type in (int, float) and type(value) is not field.type:
+                object.__setattr__(self, field.name, field.type(value))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a UI config dict, ignoring keys that aren't fields"""
+        return cls(**{name: data[name] for name in cls.__dataclass_fields__ if name in data})
+
+
+# Arguments LocalLMM requires that the UI does not expose
+_FIXED_ARGS = {
+    'n_predict': 8192,
+    'server_only': True,
+    'logs': True,
+    'inference_only': False,
+    'inference_port': None,
+    'stop': ("<|eot_id|>",),
+    'timeout': None,
+    'kv_cache': "optimized",
+    'session_id': "default",
+    'slot_id': 0,
+    'remember': True,
+    'reset_session': False,
+    'clear_slot': None,
+    'slot_save_path': None,
+}
+
+
+def build_args(config_data):
+    """Construct the LocalLMM arguments object from UI configuration"""
+    config = StartConfig.from_dict(config_data)
+    
+    args = types.SimpleNamespace(**_FIXED_ARGS)
+    args.stop = list(args.stop)
+    args.model = config.model
+    args.host = config.host
+    args.port = config.port
+    
+    # Sliders store exponents; LocalLMM expects the actual token counts
+    args.max_new_tokens = 2 ** config.max_tokens
+    args.context_size = 2 ** config.context_size
+    
+    args.temperature = config.temperature
+    args.repeat_penalty = config.repeat_penalty
+    args.threads = config.threads
+    args.gpu_layers = config.gpu_layers
+    args.cpu = (config.compute_mode == 'cpu')
+    args.gpu = (config.compute_mode == 'gpu')
+    return args
+
+
 def get_server_status():
-    """Get current server status"""
+    """Get current server status as a ServerStatus"""
     global _server_status
     return _server_status
 
 
 def set_server_status(status):
-    """Set server status"""
+    """Set server status to a ServerStatus"""
+    global _server_status
+    with _state_lock:
+        _server_status = status
+
+
+def _mark_running(shutdown_event):
+    """Move from STARTING to RUNNING unless a stop was requested meanwhile"""
     global _server_status
-    _server_status = status
+    with _state_lock:
+        if not shutdown_event.is_set():
+            _server_status = ServerStatus.RUNNING
 
 
-def run_server_in_thread(args):
+def run_server_in_thread(args, shutdown_event):
     """Run LocalLMM in a separate thread"""
     global _llm_server, _server_status
+    server = None
     try:
         # Try to import LocalLMM
         try:
             from LocalLMM import LocalLMM, LoggerWrapper
         except ImportError:
             print("LocalLMM not available, running in mock mode")
-            _server_status = "running"
-            import time
-            while _server_status == "running":
-                time.sleep(1)
+            _mark_running(shutdown_event)
+            shutdown_event.wait()
             return
 
         print("Initializing LocalLMM instance...")
         logger = LoggerWrapper()
-        _llm_server = LocalLMM(args=args, logger=logger)
+        server = LocalLMM(args=args, logger=logger)
+        with _state_lock:
+            _llm_server = server
         
         print("Starting LocalLMM server...")
-        _llm_server.run()
+        server.run()
         
-        _server_status = "running"
+        _mark_running(shutdown_event)
         
-        import time
-        while _server_status == "running":
-            time.sleep(1)
+        # Block until stop_server() signals shutdown
+        shutdown_event.wait()
             
         print("LocalLMM server execution finished")
         
-        if _llm_server:
-            _llm_server.shutdown()
+        # stop_server() may already have called shutdown() while run() was
+        # still loading; repeat it to catch processes spawned afterwards
+        server.shutdown()
             
     except Exception as e:
         print(f"Error in server thread: {e}")
-        _server_status = "error"
-        _llm_server = None
+        with _state_lock:
+            if not shutdown_event.is_set():
+                _server_status = ServerStatus.ERROR
+    finally:
+        with _state_lock:
+            if _llm_server is server:
+                _llm_server = None
+            # Report the end of a requested stop for the current run
+            if shutdown_event is _shutdown_event and _server_status is ServerStatus.STOPPING:
+                _server_status = ServerStatus.STOPPED
 
 
 def start_server(config_data):
     """Start the LLM server with given configuration"""
-    global _llm_server, _server_thread, _server_status
-    
-    if _server_status in ["running", "starting"]:
-        return False, "Server is already running"
+    global _shutdown_event, _server_thread, _server_status
     
-    try:
-        # Construct arguments object for LocalLMM
-        args = types.SimpleNamespace()
-        
-        args.model = config_data.get('model', '')
-        args.host = config_data.get('host', '127.0.0.1')
-        args.port = int(config_data.get('port', 8080))
-        args.n_predict = 8192
-        
-        # Calculate powers of 2 for slider values
-        args.max_new_tokens = 2 ** int(config_data.get('max_tokens', 13))
-        args.context_size = 2 ** int(config_data.get('context_size', 15))
-        
-        args.temperature = float(config_data.get('temperature', 0.1))
-        args.repeat_penalty = float(config_data.get('repeat_penalty', 1.2))
-        args.threads = int(config_data.get('threads', 0))
-        args.gpu_layers = int(config_data.get('gpu_layers', 999))
-        args.server_only = True
-        args.logs = True
-        
-        compute_mode = config_data.get('compute_mode', 'auto')
-        args.cpu = (compute_mode == 'cpu')
-        args.gpu = (compute_mode == 'gpu')
+    with _state_lock:
+        if _server_status in (ServerStatus.RUNNING, ServerStatus.STARTING):
+            return False, "Server is already running"
+        if _server_status is ServerStatus.STOPPING or (_server_thread and _server_thread.is_alive()):
+            return False, "Server is still stopping"
         
-        # Other required defaults
-        args.inference_only = False
-        args.inference_port = None
-        args.stop = ["<|eot_id|>"]
-        args.timeout = None
-        args.kv_cache = "optimized"
-        args.session_id = "default"
-        args.slot_id = 0
-        args.remember = True
-        args.reset_session = False
-        args.clear_slot = None
-        args.slot_save_path = None
-        
-        # Start server in thread
-        _server_status = "starting"
-        _server_thread = threading.Thread(target=run_server_in_thread, args=(args,))
-        _server_thread.daemon = True
-        _server_thread.start()
-        
-        return True, "Server starting..."
-        
-    except Exception as e:
-        _server_status = "error"
-        return False, str(e)
+        try:
+            args = build_args(config_data)
+            
+            # Start server in thread. Each run gets its own event so its
+            # stop signal can't be cleared by a later run.
+            _shutdown_event = threading.Event()
+            _server_status = ServerStatus.STARTING
+            _server_thread = threading.Thread(
+                target=run_server_in_thread, args=(args, _shutdown_event)
+            )
+            _server_thread.daemon = True
+            _server_thread.start()
+            
+            return True, "Server starting..."
+            
+        except Exception as e:
+            _server_status = ServerStatus.ERROR
+            return False, str(e)
 
 
 def stop_server():
-    """Stop the LLM server"""
-    global _llm_server, _server_status
+    """Stop the LLM server
+
+    Signals the server thread and shuts the instance down if it exists,
+    without waiting for the thread. The status stays STOPPING until the
+    thread has exited.
+    """
+    global _server_status
     
-    if _server_status == "stopped":
-        return False, "Server is not running"
+    with _state_lock:
+        if _server_status is ServerStatus.STOPPED:
+            return False, "Server is not running"
+        if _server_status is ServerStatus.STOPPING:
+            return False, "Server is already stopping"
+        
+        _shutdown_event.set()
+        server = _llm_server
+        if _server_thread and _server_thread.is_alive():
+            _server_status = ServerStatus.STOPPING
+        else:
+            _server_status = ServerStatus.STOPPED
     
     try:
-        if _llm_server:
-            _llm_server.shutdown()
-            _llm_server = None
+        # Shut down directly so a server still loading its model is
+        # interrupted rather than left running until run() returns
+        if server:
+            server.shutdown()
         
-        _server_status = "stopped"
-        return True, "Server stopped"
+        return True, "Server stopping..."
         
     except Exception as e:
         return False, str(e)
@@ -0,0 +1,266 @@
+"""Tests for the config cache, background writer and server state in llm_service."""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import orjson
+
+from libs import llm_service
+
+
+class ConfigTestCase(unittest.TestCase):
+    """Points llm_service at a temporary config file with empty caches"""
+
+    def setUp(self):
+        llm_service._flush_config_writes()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_path = Path(self.tmp_dir.name) / 'llm_config.json'
+
+        patcher = mock.patch.object(llm_service, 'CONFIG_PATH', self.config_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._reset_config_state()
+
+    def tearDown(self):
+        llm_service._flush_config_writes()
+        self._reset_config_state()
+
+    def _reset_config_state(self):
+        llm_service._config_cache = None
+        llm_service._config_mtime = -1
+        llm_service._models_json = None
+        llm_service._model_indices = {}
+        llm_service._config_version = 0
+        llm_service._config_dirty = False
+        llm_service._config_write_error = None
+
+    def _write_file(self, config):
+        self.config_path.write_bytes(orjson.dumps(config))
+
+
+class ConfigWriterTests(ConfigTestCase):
+    def _config(self, port):
+        config = llm_service.get_default_config()
+        config['frontend_defaults']['port'] = port
+        return config
+
+    def _read_file(self):
+        return orjson.loads(self.config_path.read_bytes())
+
+    def test_burst_of_saves_writes_only_latest_snapshot(self):
+        writes = []
+        real_write = llm_service._write_config_file
+
+        def record_write(version, data):
+            writes.append(version)
+            real_write(version, data)
+
+        # Queue the whole burst before the writer thread exists
+        with mock.patch.object(llm_service, '_start_config_writer'):
+            for port in range(8080, 8085):
+                self.assertTrue(llm_service.save_config(self._config(port)))
+
+        with mock.patch.object(llm_service, '_write_config_file', record_write):
+            llm_service._start_config_writer()
+            llm_service.wait_for_config_writes()
+
+        self.assertEqual(writes, [5])
+        self.assertEqual(self._read_file()['frontend_defaults']['port'], 8084)
+
+    def test_burst_queued_out_of_order_writes_highest_version(self):
+        # Two unserialized savers can enqueue after taking their versions
+        with mock.patch.object(llm_service, '_start_config_writer'), \
+                mock.patch.object(llm_service, '_write_queue') as fake_queue:
+            llm_service.save_config(self._config(9000))
+            llm_service.save_config(self._config(9001))
+        first, second = [call.args[0] for call in fake_queue.put.call_args_list]
+        llm_service._write_queue.put(second)
+        llm_service._write_queue.put(first)
+
+        llm_service._start_config_writer()
+        llm_service.wait_for_config_writes()
+
+        self.assertFalse(llm_service._config_dirty)
+        self.assertEqual(self._read_file()['frontend_defaults']['port'], 9001)
+
+    def test_pending_save_is_served_from_memory(self):
+        with mock.patch.object(llm_service, '_start_config_writer'):
+            llm_service.save_config(self._config(9000))
+
+            self.assertFalse(self.config_path.exists())
+            self.assertEqual(llm_service.load_config()['frontend_defaults']['port'], 9000)
+
+    def test_completed_write_hands_authority_back_to_file(self):
+        llm_service.save_config(self._config(9000))
+        llm_service.wait_for_config_writes()
+
+        self.assertFalse(llm_service._config_dirty)
+        self.assertEqual(llm_service._config_mtime, os.stat(self.config_path).st_mtime_ns)
+
+        # An external edit is picked up once the file owns the config again
+        external = self._config(9100)
+        self.config_path.write_bytes(orjson.dumps(external))
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertEqual(llm_service.load_config()['frontend_defaults']['port'], 9100)
+
+    def test_stale_write_does_not_hand_back_authority(self):
+        with mock.patch.object(llm_service, '_start_config_writer'):
+            llm_service.save_config(self._config(9000))
+            llm_service.save_config(self._config(9001))
+
+        # Writing the older snapshot must leave the newer one authoritative
+        llm_service._write_config_file(1, orjson.dumps(self._config(9000)))
+
+        self.assertTrue(llm_service._config_dirty)
+        self.assertEqual(llm_service.load_config()['frontend_defaults']['port'], 9001)
+
+    def test_failed_write_is_reported_and_file_becomes_authoritative(self):
+        missing_dir_path = self.config_path.parent / 'missing' / 'llm_config.json'
+        with mock.patch.object(llm_service, 'CONFIG_PATH', missing_dir_path):
+            self.assertTrue(llm_service.save_config(self._config(9000)))
+            llm_service.wait_for_config_writes()
+
+            self.assertFalse(llm_service._config_dirty)
+            self.assertIsNotNone(llm_service.get_config_write_error())
+            # Unsaved changes are dropped in favour of what is on disk
+            self.assertEqual(llm_service.load_config(), llm_service.get_default_config())
+
+            # The next save is still accepted
+            self.assertTrue(llm_service.save_config(self._config(9001)))
+            self.assertEqual(llm_service.load_config()['frontend_defaults']['port'], 9001)
+            llm_service.wait_for_config_writes()
+
+        # A later successful write clears the error
+        self.assertTrue(llm_service.save_config(self._config(9002)))
+        llm_service.wait_for_config_writes()
+        self.assertIsNone(llm_service.get_config_write_error())
+        self.assertEqual(self._read_file()['frontend_defaults']['port'], 9002)
+
+
+class EditModelsTests(ConfigTestCase):
+    def test_index_lists_every_position_of_a_file_name(self):
+        config = llm_service.get_default_config()
+        config['voice_models'] = [
+            {'file_name': 'a.bin'}, {'file_name': 'b.bin'}, {'file_name': 'a.bin'}
+        ]
+        self._write_file(config)
+
+        with llm_service.edit_models('voice_models') as (snapshot, index):
+            self.assertEqual(index['a.bin'], (0, 2))
+            self.assertEqual(index['b.bin'], (1,))
+            self.assertEqual(snapshot['voice_models'], config['voice_models'])
+
+    def test_malformed_file_falls_back_to_default_config(self):
+        self.config_path.write_bytes(b'{not json')
+
+        with llm_service.edit_models('language_models') as (snapshot, index):
+            self.assertEqual(snapshot, llm_service.get_default_config())
+            self.assertEqual(dict(index), {})
+
+
+class ServerStateTests(unittest.TestCase):
+    """Server lifecycle in mock mode, with LocalLMM made unimportable"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules, {'LocalLMM': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._reset_server_state()
+
+    def tearDown(self):
+        llm_service._shutdown_event.set()
+        self._join_server_thread()
+        self._reset_server_state()
+
+    def _reset_server_state(self):
+        llm_service._server_status = llm_service.ServerStatus.STOPPED
+        llm_service._server_thread = None
+        llm_service._llm_server = None
+        llm_service._shutdown_event = threading.Event()
+
+    def _join_server_thread(self):
+        thread = llm_service._server_thread
+        if thread is not None:
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+
+    def _hold_before_running(self):
+        """Keep the server thread in STARTING until the returned event is set"""
+        gate = threading.Event()
+        real_mark_running = llm_service._mark_running
+
+        def gated_mark_running(shutdown_event):
+            gate.wait(timeout=5)
+            real_mark_running(shutdown_event)
+
+        patcher = mock.patch.object(llm_service, '_mark_running', gated_mark_running)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(gate.set)
+        return gate
+
+    def _wait_for_status(self, status):
+        for _ in range(500):
+            if llm_service.get_server_status() is status:
+                return
+            time.sleep(0.01)
+        self.fail(f"status stayed {llm_service.get_server_status().label}, expected {status.label}")
+
+    def test_start_then_stop_ends_stopped(self):
+        self.assertEqual(llm_service.start_server({}), (True, "Server starting..."))
+        self._wait_for_status(llm_service.ServerStatus.RUNNING)
+
+        self.assertTrue(llm_service.stop_server()[0])
+        self._join_server_thread()
+
+        self.assertIs(llm_service.get_server_status(), llm_service.ServerStatus.STOPPED)
+
+    def test_stop_while_starting_never_reports_running(self):
+        gate = self._hold_before_running()
+        llm_service.start_server({})
+        self.assertIs(llm_service.get_server_status(), llm_service.ServerStatus.STARTING)
+
+        self.assertTrue(llm_service.stop_server()[0])
+        self.assertIs(llm_service.get_server_status(), llm_service.ServerStatus.STOPPING)
+
+        gate.set()
+        self._join_server_thread()
+        self.assertIs(llm_service.get_server_status(), llm_service.ServerStatus.STOPPED)
+
+    def test_start_is_refused_while_previous_thread_is_alive(self):
+        gate = self._hold_before_running()
+        llm_service.start_server({})
+        llm_service.stop_server()
+        previous_thread = llm_service._server_thread
+
+        self.assertEqual(llm_service.start_server({}), (False, "Server is still stopping"))
+        self.assertIs(llm_service._server_thread, previous_thread)
+
+        # The thread outliving a status reset must still block a new run
+        llm_service.set_server_status(llm_service.ServerStatus.STOPPED)
+        self.assertEqual(llm_service.start_server({}), (False, "Server is still stopping"))
+
+        gate.set()
+        self._join_server_thread()
+        self.assertTrue(llm_service.start_server({})[0])
+
+    def test_invalid_config_sets_error(self):
+        ok, message = llm_service.start_server({'port': 'not a port'})
+
+        self.assertFalse(ok)
+        self.assertTrue(message)
+        self.assertIs(llm_service.get_server_status(), llm_service.ServerStatus.ERROR)
+        self.assertIsNone(llm_service._server_thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@
 // Global state
 let isDropdownOpen = false;
 let serverStatus = 'idle'; // idle, starting, running, stopping, error
+let configError = null; // Last failed config write reported by the backend
 
 /**
  * Initialize dropdown on page load
@@ -19,9 +20,8 @@ let serverStatus = 'idle'; // idle, starting, running, stopping, error
 document.addEventListener('DOMContentLoaded', function () {
     console.log('Initializing LLM Server Control...');
 
-    // Load configuration and models
-    loadConfig();
-    loadModels();
+    // Load configuration, models and server status in one request
+    loadBootstrap();
 
     // Initialize Lucide icons
     if (typeof lucide !== 'undefined') {
@@ -128,13 +128,13 @@ function updateSliderValue(sliderId) {
 }
 
 /**
- * Load configuration from server
+ * Load configuration, models and server status from server in one request
  */
-async function loadConfig() {
+async function loadBootstrap() {
     try {
-        console.log('Loading configuration from server...');
+        console.log('Loading bootstrap data from server...');
 
-        const response = await fetch('/api/config');
+        const response = await fetch('/api/bootstrap');
 
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
@@ -146,16 +146,21 @@ async function loadConfig() {
             throw new Error(data.error);
         }
 
-        // Load frontend_defaults if available
-        if (data.frontend_defaults) {
-            console.log('Loaded frontend defaults:', data.frontend_defaults);
-            deserializeConfig(data.frontend_defaults);
+        // Populate models before applying defaults so the saved model can be selected
+        populateModelSelect(data.models);
+
+        if (data.config.frontend_defaults) {
+            console.log('Loaded frontend defaults:', data.config.frontend_defaults);
+            deserializeConfig(data.config.frontend_defaults);
         }
 
-        console.log('Configuration loaded successfully');
+        setServerStatus(data.status);
+        reportConfigError(data.config_error);
+
+        console.log('Bootstrap data loaded successfully');
 
     } catch (error) {
-        console.error('Failed to load configuration:', error);
+        console.error('Failed to load bootstrap data:', error);
         showError('Failed to load configuration: ' + error.message);
 
         // Use default values
@@ -182,32 +187,7 @@ async function loadModels() {
             throw new Error(models.error);
         }
 
-        // Populate model dropdown
-        const modelSelect = document.getElementById('llm-model');
-        const currentSelection = modelSelect.value;
-        modelSelect.innerHTML = '';
-
-        // Add placeholder option
-        const placeholderOption = document.createElement('option');
-        placeholderOption.value = '';
-        placeholderOption.textContent = 'Select a model...';
-        modelSelect.appendChild(placeholderOption);
-
-        // Add model options
-        models.forEach(model => {
-            const option = document.createElement('option');
-            option.value = model.file_name;
-            option.textContent = `${model.nickname} (${model.parameters_billions}B)`;
-            modelSelect.appendChild(option);
-        });
-
-        // Restore selection if valid
-        if (currentSelection) {
-            const exists = models.some(m => m.file_name === currentSelection);
-            if (exists) {
-                modelSelect.value = currentSelection;
-            }
-        }
+        populateModelSelect(models);
 
         console.log(`Loaded ${models.length} models`);
 
@@ -217,6 +197,39 @@ async function loadModels() {
     }
 }
 
+/**
+ * Populate the model dropdown, keeping the current selection if still valid
+ * 
+ * @param {Array} models - Models with file_name, nickname and parameters_billions
+ */
+function populateModelSelect(models) {
+    const modelSelect = document.getElementById('llm-model');
+    const currentSelection = modelSelect.value;
+    modelSelect.innerHTML = '';
+
+    // Add placeholder option
+    const placeholderOption = document.createElement('option');
+    placeholderOption.value = '';
+    placeholderOption.textContent = 'Select a model...';
+    modelSelect.appendChild(placeholderOption);
+
+    // Add model options
+    models.forEach(model => {
+        const option = document.createElement('option');
+        option.value = model.file_name;
+        option.textContent = `${model.nickname} (${model.parameters_billions}B)`;
+        modelSelect.appendChild(option);
+    });
+
+    // Restore selection if valid
+    if (currentSelection) {
+        const exists = models.some(m => m.file_name === currentSelection);
+        if (exists) {
+            modelSelect.value = currentSelection;
+        }
+    }
+}
+
 /**
  * Save configuration to server
  */
@@ -329,7 +342,7 @@ async function stopLLMServer() {
 
         const result = await response.json();
         console.log('Server stop request sent:', result);
-        showSuccess('Server stopped');
+        showSuccess(result.message || 'Server stopping...');
 
     } catch (error) {
         console.error('Failed to stop server:', error);
@@ -363,12 +376,26 @@ async function checkServerStatus() {
             if (data.status !== serverStatus) {
                 setServerStatus(data.status);
             }
+            reportConfigError(data.config_error);
         }
     } catch (error) {
         console.error('Error checking server status:', error);
     }
 }
 
+/**
+ * Show a failed config write once, until the backend reports a different one
+ * 
+ * @param {string|undefined} error - Error from the backend, absent when writes succeed
+ */
+function reportConfigError(error) {
+    error = error || null;
+    if (error && error !== configError) {
+        showError('Failed to save configuration: ' + error);
+    }
+    configError = error;
+}
+
 /**
  * Set server status and update UI
  * 
@@ -571,8 +598,8 @@ async function refreshModels() {
         const response = await fetch('/api/models/refresh');
         const data = await response.json();
 
-        renderModelList('language', data.language);
-        renderModelList('voice', data.voice);
+        renderModelList('language', data.language.models, data.language.exists);
+        renderModelList('voice', data.voice.models, data.voice.exists);
 
         // Also update the main dropdown
         await loadModels();
@@ -581,16 +608,23 @@ async function refreshModels() {
     }
 }
 
-function renderModelList(type, models) {
+/**
+ * Render the side panel list for one model type
+ * 
+ * @param {string} type - 'language' or 'voice'
+ * @param {Array} models - Configured models
+ * @param {Array} exists - exists[i] is true if the file for models[i] was found
+ */
+function renderModelList(type, models, exists) {
     const container = document.getElementById(`list-${type}-models`);
     container.innerHTML = '';
 
-    models.forEach(model => {
+    models.forEach((model, i) => {
         const div = document.createElement('div');
         div.className = 'flex items-center justify-between bg-slate-800/50 p-2 rounded border border-slate-700/50';
 
-        const statusColor = model.exists ? 'bg-green-500' : 'bg-red-500';
-        const statusTitle = model.exists ? 'File exists' : 'File not found';
+        const statusColor = exists[i] ? 'bg-green-500' : 'bg-red-500';
+        const statusTitle = exists[i] ? 'File exists' : 'File not found';
 
         div.innerHTML = `
             <div class="flex items-center gap-2 overflow-hidden">